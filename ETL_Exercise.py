@@ -1,7 +1,50 @@
+import os
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import md5
+from importlib.util import find_spec
+from typing import Union
+
+# set ETL_USE_MODIN=1 to run the pandas operations on all CPU cores with Modin
+# (the engine defaults to Ray, set MODIN_ENGINE to use another one)
+USE_MODIN = os.environ.get('ETL_USE_MODIN') == '1'
+if USE_MODIN:
+    import modin.config
+    import modin.pandas as pd
+    if 'MODIN_ENGINE' not in os.environ:
+        modin.config.Engine.put('Ray')
+else:
+    import pandas as pd
+
+# pyarrow parses CSVs across multiple threads, otherwise use pandas' C parser
+CSV_ENGINE = 'pyarrow' if find_spec('pyarrow') else 'c'
+
+# the strings pandas reads as missing values, so run_polars() drops the same rows
+POLARS_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+]
+
+
+def _write_csv(data: pd.DataFrame, output_file: str):
+    """
+    Saves the data to a CSV file without the index, with pandas' to_csv. The
+    file is opened with a 1MB buffer, so the rows are written in fewer, larger
+    writes than with the default buffer.
+    """
+    with open(output_file, 'wb', buffering=1 << 20) as csv_file:
+        data.to_csv(csv_file, index=False)
+
+
+def _normalise(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the data as strings, stripped and lower-cased, so that rows
+    differing only in whitespace or case are treated as the same.
+    """
+    return data.astype('string').apply(
+        lambda col: col.str.strip().str.lower()
+    )
 
 
 class CSVCleaner:
@@ -9,26 +52,66 @@ class CSVCleaner:
     This class will take an input CSV and clean the data with the methods outlined:
     - check if the input file is empty
     - removing rows with missing values
-    - check for duplicate transactions by first generating unique IDs for all rows
+    - check for duplicate transactions, comparing normalised row values
+    - optionally generate unique IDs for all rows
     - convert transaction_amount to a floating point number
     - saves the data
+    Removing rows, checking duplicates and converting transaction_amount can also
+    be run together in one pass with clean().
 
     We can add more methods here in future if needed.
     """
 
-    def __init__(self, file_path: str):
+    # known column types of the transaction data, so read_csv does not have to
+    # infer them. columns that are not in the CSV are ignored
+    DTYPES = {'customer_id': 'str', 'transaction_amount': 'float64', 'date': 'str'}
+
+    def __init__(self, file_path: Union[str, list]):
         """
-        Initialising class with a file path.
+        Initialising class with a file path (or the list of file paths, when
+        created by read_many()).
         """
         self.file_path = file_path
         self.data = None
 
+    @classmethod
+    def read_many(cls, file_paths: list) -> 'CSVCleaner':
+        """
+        Reading several CSV files with the same columns at once, in parallel
+        threads, and combining them into one CSVCleaner so that the other
+        methods clean all of the data together. Each file is read and checked
+        as in read_data().
+        """
+        combined = cls(file_paths)
+        combined.read_data()
+        return combined
+
     def read_data(self) -> pd.DataFrame:
         """
-        Reading CSV file and checking whether it is empty.
+        Reading CSV file and checking whether it is empty. Uses the multithreaded
+        pyarrow parser when pyarrow is installed, otherwise pandas' C parser
+        reading from a memory-mapped file.
+
+        If the file path is a list of paths (see read_many()), each file is read
+        and checked in a separate thread, and the data is combined in order. An
+        empty list is treated as an empty file.
         """
+        if isinstance(self.file_path, list):
+            if not self.file_path:
+                raise ValueError("The input CSV contains no data.")
+            cleaners = [type(self)(file_path) for file_path in self.file_path]
+            with ThreadPoolExecutor() as executor:
+                list(executor.map(type(self).read_data, cleaners))
+            self.data = pd.concat(
+                [cleaner.data for cleaner in cleaners], ignore_index=True
+            )
+            return self.data
+
         try:
-            self.data = pd.read_csv(self.file_path, delimiter=',')
+            self.data = pd.read_csv(
+                self.file_path, delimiter=',', engine=CSV_ENGINE,
+                dtype=self.DTYPES, memory_map=CSV_ENGINE == 'c'
+            )
             if self.data.empty:
                 raise ValueError("The input CSV contains no data.")
         except FileNotFoundError:
@@ -49,12 +132,19 @@ class CSVCleaner:
         )
         return self.data
 
-    def generate_uniqueID(self, columns: list = None) -> pd.DataFrame:
+    def generate_uniqueID(self, columns: list = None,
+                          cryptographic: bool = False) -> pd.DataFrame:
         """
         In order to robustly check for duplicates, we are generating a unique ID
-        per row. We are combining column data from each row in to a single string
-        and then using md5 hashing to create a unique ID for each row.
-        More complex methods can be used than md5, but e.g. will take longer to run.
+        per row. Each column is normalised (stripped and lower-cased) and the
+        resulting columns are hashed together with pandas' vectorised
+        hash_pandas_object, which gives a uint64 ID per row without looping over
+        the rows in Python.
+
+        If an md5 hex digest is needed (e.g. to match IDs generated previously),
+        pass cryptographic=True. This is slower as every row is md5 hashed, but
+        the keys are built up front so the hashing is a single loop over bytes.
+        Missing values are left out of the md5 key.
 
         If when calling the function, specific column names are not provided,
         the default will be using all of the columns.
@@ -64,25 +154,58 @@ class CSVCleaner:
         if columns is None:
             columns = self.data.columns.tolist()
 
-        self.data['unique_id'] = self.data.apply(
-            lambda row: md5(
-                "_".join(
-                    str(row[col]).strip().lower()
+        if cryptographic:
+            # build all of the keys first, then hash them in one tight loop
+            normalised = self._normalise_columns(columns)
+            if not normalised.isna().any(axis=None):
+                # no missing values, so the columns can be joined with str.cat
+                joined = normalised[columns[0]].str.cat(
+                    [normalised[col] for col in columns[1:]], sep='_'
+                )
+                keys = joined.str.encode('utf-8').tolist()
+            else:
+                # missing values are skipped, as in the IDs generated before,
+                # so each column is taken out as a NumPy array with None for
+                # missing values
+                arrays = [
+                    normalised[col].to_numpy(dtype=object, na_value=None)
                     for col in columns
-                    if pd.notna(row[col])
-                ).encode()
-            ).hexdigest(),
-            axis=1
-        )
+                ]
+                keys = [
+                    "_".join(
+                        value for value in row if value is not None
+                    ).encode()
+                    for row in zip(*arrays)
+                ]
+            self.data['unique_id'] = [md5(key).hexdigest() for key in keys]
+        else:
+            self.data['unique_id'] = pd.util.hash_pandas_object(
+                self._normalise_columns(columns), index=False
+            )
         return self.data
 
-    def check_duplicates(self) -> pd.DataFrame:
+    def _normalise_columns(self, columns: list) -> pd.DataFrame:
         """
-        Checking for duplicates in the new unique ID column, drops duplicate rows
-        and prints how many were dropped.
+        Returns the given columns of self.data normalised for comparison, see
+        _normalise().
+        """
+        return _normalise(self.data[columns])
+
+    def check_duplicates(self, columns: list = None) -> pd.DataFrame:
+        """
+        Checking for duplicate rows, comparing the normalised (stripped and
+        lower-cased) values of each column, drops duplicate rows and prints how
+        many were dropped. The first occurrence of each row is kept.
+
+        If when calling the function, specific column names are not provided,
+        the default will be using all of the columns apart from 'unique_id'.
         """
+        if columns is None:
+            columns = [col for col in self.data.columns if col != 'unique_id']
+
         count_row = len(self.data)
-        self.data.drop_duplicates(subset=['unique_id'], keep='first')
+        duplicated = self._normalise_columns(columns).duplicated(keep='first')
+        self.data = self.data[~duplicated]
         count_removed_rows = count_row - len(self.data)
         print('Removed {} rows with duplicate transactions.'.format(
             count_removed_rows)
@@ -100,44 +223,95 @@ class CSVCleaner:
         print("Converted transaction_amount values to float.")
         return self.data
 
+    def clean(self) -> pd.DataFrame:
+        """
+        Runs remove_rows(), check_duplicates() and convert_transaction_amount()
+        in a single pass. The rows with missing values and the duplicate rows
+        are both found on the data as read in and dropped together, so only one
+        filtered copy of the data is made. Prints the same messages as the
+        separate methods.
+        """
+        columns = [col for col in self.data.columns if col != 'unique_id']
+        missing = self.data.isna().any(axis=1)
+        # rows duplicating a row with missing values also have missing values,
+        # so checking duplicates before dropping those gives the same result
+        duplicated = self._normalise_columns(columns).duplicated(
+            keep='first'
+        ) & ~missing
+        self.data = self.data[~(missing | duplicated)]
+        print("Removed {} rows with missing values.".format(missing.sum()))
+        print('Removed {} rows with duplicate transactions.'.format(
+            duplicated.sum())
+        )
+        return self.convert_transaction_amount()
+
     def save_data(self, output_file: str) -> pd.DataFrame:
         """
         Saving cleaned data into a new CSV output file. Prints filename when saved.
+        If the output file name ends in '.parquet', the data is saved as Parquet
+        instead, which keeps the column types and is much faster to read back in.
         """
-        self.data.to_csv(output_file, index=False)
-        print("Cleaned CSV saved as: {}".format(output_file))
+        if output_file.endswith('.parquet'):
+            self.data.to_parquet(
+                output_file, engine='pyarrow', compression='snappy', index=False
+            )
+            print("Cleaned Parquet file saved as: {}".format(output_file))
+        else:
+            _write_csv(self.data, output_file)
+            print("Cleaned CSV saved as: {}".format(output_file))
         return self.data
 
 
 class Transformations:
     """
-    This will take an input CSV (this should be the cleaned CSV) and perform the
-    transformations outlined:
+    This will take an input CSV or Parquet file, or a DataFrame (this should be
+    the cleaned data) and perform the transformations outlined:
     - grouping the transactions by customer_id and calculating the total
       transaction amount per customer
 
     We can add more transformation methods here in future if needed.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, source: Union[str, pd.DataFrame]):
         """
-        Initialises the class, with a file path. Reads in CSV.
+        Initialises the class, with a file path or a DataFrame. A DataFrame
+        (e.g. CSVCleaner.data) is used as it is, without saving and reading it
+        in again. A file is read in as Parquet if the name ends in '.parquet',
+        otherwise as CSV.
         """
-        self.file_path = file_path
-        self.data = pd.read_csv(self.file_path, delimiter=',')
+        if isinstance(source, pd.DataFrame):
+            self.file_path = None
+            self.data = source
+        elif source.endswith('.parquet'):
+            self.file_path = source
+            self.data = pd.read_parquet(self.file_path, engine='pyarrow')
+        else:
+            self.file_path = source
+            self.data = pd.read_csv(
+                self.file_path, delimiter=',', engine=CSV_ENGINE
+            )
 
     def group_by_customer_id(self) -> pd.DataFrame:
         """
         Grouping by customer_id and the aggregate function is calculating total
-        transaction amount per customer.
-        """
-        groupby_data = self.data.groupby(
-            'customer_id', as_index=False
-        )['transaction_amount'].sum()
-        groupby_data.rename(
-            columns={'transaction_amount': 'total_transaction_amount'},
-            inplace=True
+        transaction amount per customer. The customer_ids are encoded as sorted
+        integer codes, and the amounts are summed per code with a pandas group
+        by, which uses error-corrected (Kahan) summation so totals such as ten
+        0.1s come to exactly 1.0. Missing customer_ids are left out, and missing
+        amounts count as 0.
+        """
+        codes, customer_ids = pd.factorize(self.data['customer_id'], sort=True)
+        amounts = self.data['transaction_amount'].to_numpy(
+            dtype='float64', na_value=0.0
         )
+        present = codes >= 0
+        totals = pd.Series(amounts[present]).groupby(
+            codes[present], sort=True
+        ).sum().to_numpy()
+        groupby_data = pd.DataFrame({
+            'customer_id': customer_ids,
+            'total_transaction_amount': totals
+        })
         self.data = groupby_data
         return self.data
 
@@ -145,30 +319,40 @@ class Transformations:
         """
         Saving transformed data into a new CSV output file. Prints filename when saved.
         """
-        self.data.to_csv(output_file, index=False)
+        _write_csv(self.data, output_file)
         print("Transformed CSV saved as: {}".format(output_file))
         return self.data
 
 
-def main():
+def main(backend: str = 'pandas'):
     """
     Runs the full ETL pipeline.
-    1) cleans the CSV and saves the data to 'cleaned_data.csv'
-    2) transforms the CSV and saves the data to 'aggregated_transactions.csv'
+    1) cleans the CSV
+    2) transforms the cleaned data and saves it to 'aggregated_transactions.csv'
     3) prints the final output data
+    If backend is 'polars', the pipeline is run with run_polars() instead. This
+    does not print how many rows were removed, as the Polars query does not
+    count them.
     """
+    if backend not in ('pandas', 'polars'):
+        raise ValueError(
+            "Unknown backend: {}. Use 'pandas' or 'polars'.".format(backend)
+        )
+    if backend == 'polars':
+        output_data = run_polars('input_data.csv', 'aggregated_transactions.csv')
+        print("\n The final output CSV (cleaned and transformed):\n\n {}".format(
+            output_data)
+        )
+        return
+
     clean_csv = CSVCleaner('input_data.csv')
 
     clean_csv.read_data()
-    clean_csv.remove_rows()
-    clean_csv.generate_uniqueID()
-    clean_csv.check_duplicates()
-    clean_csv.convert_transaction_amount()
-
-    clean_csv.save_data('cleaned_data.csv')
+    clean_csv.clean()
 
-    # now take cleaned CSV file and apply transformations
-    transform_csv = Transformations('cleaned_data.csv')
+    # now take cleaned data and apply transformations. the cleaned data is
+    # passed on in memory, use clean_csv.save_data() if a copy is needed
+    transform_csv = Transformations(clean_csv.data)
 
     transform_csv.group_by_customer_id()
 
@@ -185,5 +369,155 @@ def main():
     )
 
 
+def _in_hashes(runs: list, hashes: np.ndarray) -> np.ndarray:
+    """
+    Returns whether each of the hashes is in any of the sorted runs of hashes
+    kept by _add_hashes(), with a binary search of each run. The hashes are
+    sorted first, so the searches go through each run in order, which is much
+    faster on large runs than searching in a random order.
+    """
+    order = np.argsort(hashes)
+    sorted_hashes = hashes[order]
+    found = np.zeros(len(hashes), dtype=bool)
+    for run in runs:
+        positions = np.minimum(np.searchsorted(run, sorted_hashes), len(run) - 1)
+        found[order] |= run[positions] == sorted_hashes
+    return found
+
+
+def _add_hashes(runs: list, hashes: np.ndarray):
+    """
+    Adds the hashes to the list of sorted runs, as a new run. Like carrying in a
+    binary counter, the last two runs are merged while the newer one is at least
+    as long as the one before, so there are only about log2(n) runs and each
+    hash is only copied about log2(n) times in total, rather than the whole
+    array being copied for every chunk.
+    """
+    if len(hashes) == 0:
+        return
+    runs.append(np.sort(hashes))
+    while len(runs) > 1 and len(runs[-2]) <= len(runs[-1]):
+        newer = runs.pop()
+        # a stable sort merges the two sorted runs in linear time
+        runs[-1] = np.sort(np.concatenate([runs[-1], newer]), kind='stable')
+
+
+def run_streaming(input_file: str, cleaned_file: str, output_file: str,
+                  chunksize: int = 200_000) -> pd.DataFrame:
+    """
+    Runs the same ETL pipeline as main(), but reads the input CSV in chunks, so
+    the whole file is never in memory at once. This is for input files that are
+    too large to clean in memory at once.
+    - each chunk is cleaned and appended to the cleaned CSV
+    - duplicates are checked across chunks by keeping the 64-bit hashes of the
+      normalised rows seen so far (see _add_hashes()). This takes 8 bytes for
+      each unique row, so memory use still grows with the size of the file, but
+      much more slowly than the data itself. Rows are compared by hash only, so
+      two different rows with the same hash would be treated as duplicates and
+      the second one dropped. With n unique rows the chance of this is about
+      n * n / 2 ** 65, e.g. 1 in 3,700 for 100 million rows
+    - total transaction amounts are summed per customer_id as each chunk is
+      read, and saved to the output CSV at the end
+    """
+    # every chunk is read with the same column types, so the same values are
+    # normalised to the same strings in every chunk
+    dtypes = {**CSVCleaner.DTYPES, 'transaction_id': 'Int64'}
+    # sorted runs of the hashes of the normalised rows kept so far
+    seen_rows = []
+    totals = {}
+    count_row = 0
+    count_missing = 0
+    count_duplicates = 0
+
+    for chunk in pd.read_csv(
+        input_file, delimiter=',', dtype=dtypes, chunksize=chunksize
+    ):
+        # remove rows with missing values
+        count_chunk = len(chunk)
+        chunk = chunk.dropna()
+        count_missing += count_chunk - len(chunk)
+
+        # remove duplicates, within this chunk and with earlier chunks
+        row_hashes = pd.util.hash_pandas_object(_normalise(chunk), index=False)
+        duplicated = row_hashes.duplicated(keep='first').to_numpy() | _in_hashes(
+            seen_rows, row_hashes.to_numpy()
+        )
+        count_duplicates += int(duplicated.sum())
+        _add_hashes(seen_rows, row_hashes.to_numpy()[~duplicated])
+        chunk = chunk[~duplicated]
+
+        chunk['transaction_amount'] = pd.to_numeric(
+            chunk['transaction_amount'], errors='raise'
+        )
+        chunk.to_csv(
+            cleaned_file, mode='w' if count_row == 0 else 'a',
+            header=count_row == 0, index=False
+        )
+        count_row += count_chunk
+
+        # add this chunk's totals to the running totals per customer
+        chunk_totals = chunk.groupby('customer_id')['transaction_amount'].sum()
+        for customer_id, amount in chunk_totals.items():
+            totals[customer_id] = totals.get(customer_id, 0.0) + amount
+
+    if count_row == 0:
+        raise ValueError("The input CSV contains no data.")
+    print("Removed {} rows with missing values.".format(count_missing))
+    print('Removed {} rows with duplicate transactions.'.format(
+        count_duplicates)
+    )
+    print("Cleaned CSV saved as: {}".format(cleaned_file))
+
+    groupby_data = pd.DataFrame({
+        'customer_id': list(totals.keys()),
+        'total_transaction_amount': list(totals.values())
+    }).sort_values('customer_id', ignore_index=True)
+    _write_csv(groupby_data, output_file)
+    print("Transformed CSV saved as: {}".format(output_file))
+    return groupby_data
+
+
+def run_polars(input_file: str, output_file: str) -> pd.DataFrame:
+    """
+    Runs the same ETL pipeline as main(), but with Polars instead of pandas.
+    The steps are built up as one lazy Polars query, which is run on all CPU
+    cores and streamed from the input CSV to the output CSV, so the whole file
+    does not need to fit in memory. Needs polars to be installed.
+    Returns the saved output (one row per customer), read back in with pandas.
+    """
+    import polars as pl
+
+    query = pl.scan_csv(
+        input_file,
+        null_values=POLARS_NULL_VALUES,
+        schema_overrides={
+            'customer_id': pl.String,
+            'transaction_amount': pl.Float64,
+            'date': pl.String
+        }
+    )
+    columns = query.collect_schema().names()
+    # normalised copies of each column to check for duplicates, as in pandas
+    normalised = ['_normalised_{}'.format(col) for col in columns]
+
+    query = (
+        query
+        .drop_nulls()
+        .with_columns([
+            pl.col(col).cast(pl.String).str.strip_chars().str.to_lowercase()
+            .alias(norm_col)
+            for col, norm_col in zip(columns, normalised)
+        ])
+        .unique(subset=normalised, keep='first', maintain_order=True)
+        .group_by('customer_id')
+        .agg(pl.col('transaction_amount').sum().alias('total_transaction_amount'))
+        .sort('customer_id')
+    )
+    query.sink_csv(output_file)
+    print("Transformed CSV saved as: {}".format(output_file))
+    return pd.read_csv(output_file, delimiter=',')
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # set ETL_BACKEND=polars to run the pipeline with Polars
+    main(backend=os.environ.get('ETL_BACKEND', 'pandas'))
\ No newline at end of file
@@ -1,55 +1,39 @@
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from hashlib import md5
+from pathlib import Path
 
 """
 This performs the ETL task in a simple way without classes/functions.
 """
 
+input_file = Path('input_data.csv')
+
 # reading in the input CSV
-try:
-    input_data = pd.read_csv('input_data.csv', delimiter=',')
+if not input_file.exists():
+    print("Error: file not found.")
+else:
+    input_data = pd.read_csv(input_file, delimiter=',')
     if input_data.empty:
         print("Error: file is empty.")
-except FileNotFoundError:
-    print("Error: file not found.")
-    
-# remove rows with missing values
-input_data.dropna(inplace=True)
-
-# convert transaction_amount column to float64
-input_data['transaction_amount'] = pd.to_numeric(
-    input_data['transaction_amount'], errors='raise'
-)
-
-# check for duplicates by creating unique IDs
-
-# create columns list
-columns = input_data.columns.tolist()
-
-# generating unique ID
-input_data['unique_id'] = input_data.apply(
-            lambda row: md5(
-                "_".join(
-                    str(row[col]).strip().lower()
-                    for col in columns
-                    if pd.notna(row[col])
-                ).encode()
-            ).hexdigest(),
-            axis=1
-        )
-# drop duplicates
-input_data.drop_duplicates(subset=['unique_id'], keep='first')
-
-# group data by customer_id and find total transaction amount for each
-groupby_data = input_data.groupby(
-            'customer_id', as_index=False
-        )['transaction_amount'].sum()
-groupby_data.rename(
-            columns={'transaction_amount': 'total_transaction_amount'},
-            inplace=True
-        )
 
-# now save the groupby_data to a CSV file for output
-groupby_data.to_csv('aggregated_transactions.csv', index=False)
+    groupby_data = (
+        input_data
+        # remove rows with missing values
+        .dropna()
+        # drop duplicates, comparing hashes of the stripped, lower-cased rows
+        .loc[lambda data: ~pd.util.hash_pandas_object(
+            data.astype('string').apply(
+                lambda col: col.str.strip().str.lower()
+            ),
+            index=False
+        ).duplicated(keep='first').to_numpy()]
+        # convert transaction_amount column to float64
+        .assign(transaction_amount=lambda data: pd.to_numeric(
+            data['transaction_amount'], errors='raise'
+        ))
+        # group data by customer_id and find total transaction amount for each
+        .groupby('customer_id', as_index=False)['transaction_amount'].sum()
+        .rename(columns={'transaction_amount': 'total_transaction_amount'})
+    )
+
+    # now save the groupby_data to a CSV file for output
+    groupby_data.to_csv('aggregated_transactions.csv', index=False)
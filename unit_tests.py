@@ -1,13 +1,15 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import unittest
 from hashlib import md5
+from importlib.util import find_spec
 from io import StringIO
 
 # importing classes to be tested from original script
-from ETL_Exercise import CSVCleaner, Transformations
+from ETL_Exercise import (
+    CSVCleaner, Transformations, main, run_polars, run_streaming
+)
 
 
 class TestCSVCleaner(unittest.TestCase):
@@ -67,6 +69,41 @@ class TestCSVCleaner(unittest.TestCase):
         self.assertIsInstance(data, pd.DataFrame)
         self.assertEqual(len(data), 12)
 
+    def test_read_many(self):
+        """
+        Testing CSVCleaner's read_many() class method. The test DataFrame is
+        split in to two CSV files, which are read in together. Checks the
+        combined data has all of the rows, in order, and can be read in again
+        with read_data().
+        """
+        # split test data in to two CSV files, removed after the test even if
+        # it fails
+        file_paths = ['test_input_data_1.csv', 'test_input_data_2.csv']
+        self.test_data.iloc[:5].to_csv(file_paths[0], index=False)
+        self.test_data.iloc[5:].to_csv(file_paths[1], index=False)
+        for file_path in file_paths:
+            self.addCleanup(os.remove, file_path)
+        # implement method to test
+        cleaner = CSVCleaner.read_many(file_paths)
+        # set assertions
+        self.assertEqual(cleaner.file_path, file_paths)
+        self.assertEqual(len(cleaner.data), 12)
+        self.assertEqual(
+            cleaner.data['transaction_id'].tolist(),
+            self.test_data['transaction_id'].tolist()
+        )
+        # set assertion that the combined data can be read in again
+        self.assertEqual(len(cleaner.read_data()), 12)
+
+    def test_read_many_no_files(self):
+        """
+        Testing CSVCleaner's read_many() class method with no files, which
+        should raise the same error as an empty CSV file.
+        """
+        # implement method to test and set assertion
+        with self.assertRaisesRegex(ValueError, 'contains no data'):
+            CSVCleaner.read_many([])
+
     def test_remove_rows(self):
         """
         Testing CSVCleaner's remove_rows() method. Begins with initialising and
@@ -101,6 +138,60 @@ class TestCSVCleaner(unittest.TestCase):
         self.assertEqual(len(data_with_id), 8)
         self.assertTrue(data_with_id['unique_id'].is_unique)
 
+    def test_generate_uniqueID_cryptographic(self):
+        """
+        Testing CSVCleaner's generate_uniqueID() method with cryptographic=True.
+        Checks that the IDs are the md5 hex digests of the joined row values.
+        """
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        # implement previous methods
+        cleaner.read_data()
+        cleaner.remove_rows()
+        # implement method to test
+        data_with_id = cleaner.generate_uniqueID(cryptographic=True)
+        # expected md5 for the first row
+        expected_id = md5('1001_abc123_45.67_10/01/2024'.encode()).hexdigest()
+        # set assertions
+        self.assertEqual(data_with_id['unique_id'].iloc[0], expected_id)
+        self.assertTrue(data_with_id['unique_id'].is_unique)
+
+    def test_generate_uniqueID_cryptographic_missing_values(self):
+        """
+        Testing CSVCleaner's generate_uniqueID() method with cryptographic=True
+        on rows with missing values. Checks that missing values are left out of
+        the md5 key, as in the IDs generated before.
+        """
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        # implement previous methods, keeping the rows with missing values
+        cleaner.read_data()
+        # implement method to test
+        data_with_id = cleaner.generate_uniqueID(cryptographic=True)
+        # expected md5 for the second row, which has no transaction_amount
+        expected_id = md5('1002_xyz789_11/01/2024'.encode()).hexdigest()
+        # set assertions
+        self.assertEqual(data_with_id['unique_id'].iloc[1], expected_id)
+
+    def test_check_duplicates_after_data_changed(self):
+        """
+        Testing CSVCleaner's check_duplicates() method after cleaner.data has
+        been changed directly, following generate_uniqueID(). Checks that the
+        duplicate check uses the current data, so no rows are dropped.
+        """
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        # implement previous methods, with row 2 made a copy of row 0
+        cleaner.read_data()
+        cleaner.data.loc[2] = cleaner.data.loc[0]
+        cleaner.generate_uniqueID()
+        # change the data directly, so rows 0 and 2 are no longer duplicates
+        cleaner.data.loc[0, 'customer_id'] = 'QQQ'
+        # implement method to test
+        data_no_duplicates = cleaner.check_duplicates()
+        # set assertion
+        self.assertEqual(len(data_no_duplicates), 12)
+
     def test_check_duplicates(self):
         """
         Testing CSVCleaner's check_duplicates() method. Begins with initialising
@@ -118,6 +209,30 @@ class TestCSVCleaner(unittest.TestCase):
         # set assertion
         self.assertEqual(len(data_no_duplicates), 8)
 
+    def test_check_duplicates_removes_duplicate(self):
+        """
+        Testing CSVCleaner's check_duplicates() method on data with a true
+        duplicate. A copy of the first row (with different case and whitespace
+        in customer_id) is added to the test CSV. Sets the assertion, and checks
+        that the len() decreases by 1 and the first occurrence is kept.
+        """
+        # add a duplicate of the first row to the test CSV
+        duplicate_row = self.test_data.iloc[[0]].copy()
+        duplicate_row['customer_id'] = ' abc123 '
+        duplicated_data = pd.concat([self.test_data, duplicate_row])
+        duplicated_data.to_csv(self.test_csv_path, index=False)
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        # implement previous methods
+        cleaner.read_data()
+        cleaner.remove_rows()
+        count_row = len(cleaner.data)
+        # implement method to test
+        data_no_duplicates = cleaner.check_duplicates()
+        # set assertions
+        self.assertEqual(len(data_no_duplicates), count_row - 1)
+        self.assertEqual(data_no_duplicates['customer_id'].iloc[0], 'ABC123')
+
     def test_convert_transaction_amount(self):
         """
         Testing CSVCleaner's convert_transaction_amount() method. Begins with
@@ -138,6 +253,31 @@ class TestCSVCleaner(unittest.TestCase):
             pd.api.types.is_float_dtype(data_converted['transaction_amount'])
         )
 
+    def test_clean(self):
+        """
+        Testing CSVCleaner's clean() method, which runs remove_rows(),
+        check_duplicates() and convert_transaction_amount() in one pass. A
+        duplicate row is added to the test CSV. Checks the result is the same
+        as running the separate methods one after another.
+        """
+        # add a duplicate of the first row to the test CSV
+        duplicated_data = pd.concat([self.test_data, self.test_data.iloc[[0]]])
+        duplicated_data.to_csv(self.test_csv_path, index=False)
+        # run the separate methods for the expected output
+        expected = CSVCleaner(self.test_csv_path)
+        expected.read_data()
+        expected.remove_rows()
+        expected.check_duplicates()
+        expected.convert_transaction_amount()
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        cleaner.read_data()
+        # implement method to test
+        cleaned_data = cleaner.clean()
+        # set assertions
+        self.assertEqual(len(cleaned_data), 8)
+        pd.testing.assert_frame_equal(cleaned_data, expected.data)
+
     def test_save_data(self):
         """
         Testing CSVCleaner's save_data() method. Begins with initialising and then
@@ -166,6 +306,33 @@ class TestCSVCleaner(unittest.TestCase):
         # remove the output file to keep things tidy in directory
         os.remove(output_file)
 
+    @unittest.skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_save_data_parquet(self):
+        """
+        Testing CSVCleaner's save_data() method with a '.parquet' output file.
+        Reads the saved file back in and checks it matches the cleaned data,
+        including the column types.
+        """
+        # initialise
+        cleaner = CSVCleaner(self.test_csv_path)
+        # implement all previous methods
+        cleaner.read_data()
+        cleaner.remove_rows()
+        cleaner.check_duplicates()
+        cleaner.convert_transaction_amount()
+        # name output file
+        output_file = 'test_cleaned_data.parquet'
+        # implement method to test
+        cleaner.save_data(output_file)
+        # reading in saved Parquet file
+        saved_data = pd.read_parquet(output_file)
+        # reset the index of test cleaner.data to match saved data
+        cleaner.data.reset_index(drop=True, inplace=True)
+        # set assertions
+        pd.testing.assert_frame_equal(saved_data, cleaner.data)
+        # remove the output file to keep things tidy in directory
+        os.remove(output_file)
+
 
 class TestTransformations(unittest.TestCase):
     """
@@ -227,6 +394,73 @@ class TestTransformations(unittest.TestCase):
         # set assertions that the two dataframes are equal
         pd.testing.assert_frame_equal(grouped_data, expected_data)
 
+    def test_group_by_customer_id_exact_total(self):
+        """
+        Testing that the Transformations class group_by_customer_id() method
+        sums amounts without adding up floating point error, so ten amounts of
+        0.1 give a total of exactly 1.0, and the saved CSV says 1.0.
+        """
+        # initialise with ten 0.1 transactions for one customer
+        transformer = Transformations(pd.DataFrame({
+            'customer_id': ['ABC123'] * 10,
+            'transaction_amount': [0.1] * 10
+        }))
+        # implement method to test
+        grouped_data = transformer.group_by_customer_id()
+        # name output
+        output_file = 'test_aggregated_transactions.csv'
+        self.addCleanup(os.remove, output_file)
+        transformer.save_data(output_file)
+        # set assertions
+        self.assertEqual(grouped_data['total_transaction_amount'].iloc[0], 1.0)
+        with open(output_file) as saved_file:
+            self.assertEqual(
+                saved_file.read(),
+                'customer_id,total_transaction_amount\nABC123,1.0\n'
+            )
+
+    def test_dataframe_input(self):
+        """
+        Testing that the Transformations class can be initialised with a
+        DataFrame instead of a file path, and the group by method gives the
+        same result.
+        """
+        # initialise with the cleaned dataframe
+        transformer = Transformations(self.cleaned_data)
+        # implement method
+        grouped_data = transformer.group_by_customer_id()
+        # specify expected dataframe after group by method
+        expected_data = pd.DataFrame({
+            'customer_id': ['ABC123', 'DEF567', 'LMN456', 'XYZ789'],
+            'total_transaction_amount': [101.17, 75.25, 50.0, 75.5]
+        })
+        # set assertions
+        self.assertIsNone(transformer.file_path)
+        pd.testing.assert_frame_equal(grouped_data, expected_data)
+
+    @unittest.skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_read_parquet(self):
+        """
+        Testing that the Transformations class reads in a '.parquet' file, by
+        saving the cleaned data as Parquet and running the group by method.
+        """
+        # save cleaned data as Parquet
+        parquet_path = 'test_cleaned_data.parquet'
+        self.cleaned_data.to_parquet(parquet_path, index=False)
+        # initialise
+        transformer = Transformations(parquet_path)
+        # implement method
+        grouped_data = transformer.group_by_customer_id()
+        # specify expected dataframe after group by method
+        expected_data = pd.DataFrame({
+            'customer_id': ['ABC123', 'DEF567', 'LMN456', 'XYZ789'],
+            'total_transaction_amount': [101.17, 75.25, 50.0, 75.5]
+        })
+        # set assertions
+        pd.testing.assert_frame_equal(grouped_data, expected_data)
+        # remove the Parquet file to keep things tidy in directory
+        os.remove(parquet_path)
+
     def test_save_data(self):
         """
         Testing the save_data() method, as in previous unit test class.
@@ -249,5 +483,174 @@ class TestTransformations(unittest.TestCase):
         os.remove(output_file)
 
 
+class TestPipelines(unittest.TestCase):
+    """
+    Unit tests on the functions that run the whole pipeline from file to file:
+    run_streaming() and run_polars(). Uses the same test DataFrame as
+    TestCSVCleaner, with a duplicate row added so that it falls in a different
+    chunk to the original row. After setting up the test, implement a tearDown
+    method to remove the test files after each test.
+    """
+
+    def setUp(self):
+        """
+        Sets up the test DataFrame with a duplicate row and saves to a CSV file.
+        """
+        self.test_data = pd.DataFrame({
+            'transaction_id': [
+                1001, 1002, 1003, 1004, 1005, 1006, 1007, 1008, 1009, 1010, 1011,
+                1012, 1001
+            ],
+            'customer_id': [
+                'ABC123', 'XYZ789', 'ABC123', 'XYZ789', 'LMN456', 'ABC123',
+                'ABC123', 'DEF567', 'XYZ789', 'LMN456', 'ABC123', 'NULL', 'ABC123'
+            ],
+            'transaction_amount': [
+                45.67, np.nan, 20, 35.5, 50, 15.5, 20, 75.25, 40, np.nan, np.nan,
+                100.5, 45.67
+            ],
+            'date': [
+                '10/01/2024', '11/01/2024', '12/01/2024', '13/01/2024',
+                '14/01/2024', '15/01/2024', '12/01/2024', '16/01/2024',
+                '17/01/2024', '18/01/2024', '19/01/2024', '20/01/2024',
+                '10/01/2024'
+            ]
+        })
+        self.test_csv_path = 'test_input_data.csv'
+        self.test_data.to_csv(self.test_csv_path, index=False)
+        self.cleaned_csv_path = 'test_cleaned_data.csv'
+        self.output_csv_path = 'test_aggregated_transactions.csv'
+
+    def tearDown(self):
+        """
+        This removes the test CSV files after each test.
+        """
+        for path in [
+            self.test_csv_path, self.cleaned_csv_path, self.output_csv_path
+        ]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_run_streaming(self):
+        """
+        Testing run_streaming() with a small chunk size, so the input is read in
+        several chunks. Checks the cleaned CSV has the missing values and the
+        duplicate removed, and the aggregated output matches the expected totals.
+        """
+        # implement function to test
+        grouped_data = run_streaming(
+            self.test_csv_path, self.cleaned_csv_path, self.output_csv_path,
+            chunksize=5
+        )
+        # specify expected dataframe after group by
+        expected_data = pd.DataFrame({
+            'customer_id': ['ABC123', 'DEF567', 'LMN456', 'XYZ789'],
+            'total_transaction_amount': [101.17, 75.25, 50.0, 75.5]
+        })
+        # set assertions
+        self.assertEqual(len(pd.read_csv(self.cleaned_csv_path)), 8)
+        pd.testing.assert_frame_equal(grouped_data, expected_data)
+        pd.testing.assert_frame_equal(
+            pd.read_csv(self.output_csv_path), expected_data
+        )
+
+    def test_run_streaming_duplicate_across_chunks(self):
+        """
+        Testing run_streaming() with a duplicate row in a different chunk to the
+        original, where the first chunk has a missing amount and the second does
+        not. Checks the duplicate is still found, so the amount is only counted
+        once, and the cleaned CSV writes every amount the same way.
+        """
+        # first chunk has a missing amount, second chunk is all whole numbers.
+        # written as text so the amounts are saved as '20' rather than '20.0'
+        with open(self.test_csv_path, 'w') as test_file:
+            test_file.write(
+                'transaction_id,customer_id,transaction_amount,date\n'
+                '1001,ABC123,20,10/01/2024\n'
+                '1002,XYZ789,,11/01/2024\n'
+                '1003,ABC123,30,12/01/2024\n'
+                '1001,ABC123,20,10/01/2024\n'
+                '1004,LMN456,50,14/01/2024\n'
+            )
+        # implement function to test
+        grouped_data = run_streaming(
+            self.test_csv_path, self.cleaned_csv_path, self.output_csv_path,
+            chunksize=3
+        )
+        # specify expected dataframe after group by
+        expected_data = pd.DataFrame({
+            'customer_id': ['ABC123', 'LMN456'],
+            'total_transaction_amount': [50.0, 50.0]
+        })
+        # set assertions
+        pd.testing.assert_frame_equal(grouped_data, expected_data)
+        with open(self.cleaned_csv_path) as cleaned_file:
+            amounts = [line.split(',')[2] for line in cleaned_file][1:]
+        self.assertEqual(amounts, ['20.0', '30.0', '50.0'])
+
+    def test_output_files_match(self):
+        """
+        Testing that the class pipeline in main(), run_streaming() and (if polars
+        is installed) run_polars() write exactly the same aggregated CSV file.
+        Compares the raw text of the files, not the data read back in.
+        """
+        # run the class pipeline as in main()
+        cleaner = CSVCleaner(self.test_csv_path)
+        cleaner.read_data()
+        cleaner.clean()
+        transformer = Transformations(cleaner.data)
+        transformer.group_by_customer_id()
+        transformer.save_data(self.output_csv_path)
+        with open(self.output_csv_path) as output_file:
+            main_output = output_file.read()
+        # specify expected text of the output file
+        expected_output = (
+            'customer_id,total_transaction_amount\n'
+            'ABC123,101.17\n'
+            'DEF567,75.25\n'
+            'LMN456,50.0\n'
+            'XYZ789,75.5\n'
+        )
+        self.assertEqual(main_output, expected_output)
+        # run the other backends and compare their output files
+        run_streaming(
+            self.test_csv_path, self.cleaned_csv_path, self.output_csv_path,
+            chunksize=5
+        )
+        with open(self.output_csv_path) as output_file:
+            self.assertEqual(output_file.read(), expected_output)
+        if find_spec('polars'):
+            run_polars(self.test_csv_path, self.output_csv_path)
+            with open(self.output_csv_path) as output_file:
+                self.assertEqual(output_file.read(), expected_output)
+
+    @unittest.skipUnless(find_spec('polars'), 'polars is not installed')
+    def test_run_polars(self):
+        """
+        Testing run_polars(). Checks the aggregated output has the missing
+        values and the duplicate removed and matches the expected totals.
+        """
+        # implement function to test
+        grouped_data = run_polars(self.test_csv_path, self.output_csv_path)
+        # specify expected dataframe after group by
+        expected_data = pd.DataFrame({
+            'customer_id': ['ABC123', 'DEF567', 'LMN456', 'XYZ789'],
+            'total_transaction_amount': [101.17, 75.25, 50.0, 75.5]
+        })
+        # set assertions
+        pd.testing.assert_frame_equal(grouped_data, expected_data)
+        pd.testing.assert_frame_equal(
+            pd.read_csv(self.output_csv_path), expected_data
+        )
+
+    def test_main_unknown_backend(self):
+        """
+        Testing that main() raises a ValueError for a backend it does not know,
+        rather than running the pandas pipeline.
+        """
+        with self.assertRaises(ValueError):
+            main(backend='Polars')
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file